@@ -58,6 +58,12 @@ class Mic(object):
         self._active_stt_reply = active_stt_reply
         self._active_stt_response = active_stt_response
         self.passive_listen = passive_listen
+        # Transcribe each part of an active utterance as the speaker
+        # pauses, instead of waiting for the whole utterance
+        self._transcribe_partials = profile.get_profile_flag(
+            ['active_stt', 'transcribe_partials'],
+            False
+        )
         # transcript for monitoring
         self._print_transcript = print_transcript
         # audiolog for training
@@ -251,11 +257,11 @@ class Mic(object):
             wav_fp.setnchannels(self._input_device._input_channels)
             wav_fp.setsampwidth(int(self._input_device._input_bits / 8))
             wav_fp.setframerate(framerate)
-            if self._input_device._input_rate == framerate:
-                fragment = b''.join(frames)
-            else:
+            # Concatenate the captured frames once, in a single copy
+            fragment = b''.join(frames)
+            if self._input_device._input_rate != framerate:
                 fragment = audioop.ratecv(
-                    ''.join(frames),
+                    fragment,
                     int(self._input_device._input_bits / 8),
                     self._input_device._input_channels,
                     self._input_device._input_rate,
@@ -327,28 +333,15 @@ class Mic(object):
                             println("<  <noise>\n")
                             self._log_audio(f, "", "noise")
 
-    def active_listen(self, timeout=3):
+    # Transcribe recorded frames with the active STT engine. Returns an
+    # empty list if transcription fails.
+    def _active_transcribe(self, frames):
         transcribed = []
-        # let the user know we are listening
-        if self._active_stt_reply:
-            self.say(self._active_stt_reply)
-        else:
-            self._logger.debug("No text to respond with using beep")
-            if(self._print_transcript):
-                println(">> <beep>\n")
-            self.play_file(paths.data('audio', 'beep_hi.wav'))
         with self._write_frames_to_file(
-            self._vad_plugin.get_audio(),
+            frames,
             self.active_stt_engine._samplerate,
             self.active_stt_engine._volume_normalization
         ) as f:
-            if self._active_stt_response:
-                self.say(self._active_stt_response)
-            else:
-                self._logger.debug("No text to respond with using beep")
-                if(self._print_transcript):
-                    println(">> <boop>\n")
-                self.play_file(paths.data('audio', 'beep_lo.wav'))
             try:
                 transcribed = self.active_stt_engine.transcribe(f)
             except Exception:
@@ -361,6 +354,49 @@ class Mic(object):
                     self._log_audio(f, transcribed, "active")
         return transcribed
 
+    def active_listen(self, timeout=3):
+        transcribed = []
+        # let the user know we are listening
+        if self._active_stt_reply:
+            self.say(self._active_stt_reply)
+        else:
+            self._logger.debug("No text to respond with using beep")
+            if(self._print_transcript):
+                println(">> <beep>\n")
+            self.play_file(paths.data('audio', 'beep_hi.wav'))
+        # If partial transcription is on, each part of the utterance is
+        # transcribed when the speaker pauses, while the rest of it is
+        # still being recorded.
+        transcriptions = []
+        partial_callback = None
+        if(self._transcribe_partials):
+            def partial_callback(frames):
+                transcriptions.append(self._active_transcribe(frames))
+        recording = self._vad_plugin.get_audio(partial_callback)
+        if self._active_stt_response:
+            self.say(self._active_stt_response)
+        else:
+            self._logger.debug("No text to respond with using beep")
+            if(self._print_transcript):
+                println(">> <boop>\n")
+            self.play_file(paths.data('audio', 'beep_lo.wav'))
+        # get_audio returns None if the input device stopped, or if
+        # everything that was said went to the partial callback
+        if recording is not None:
+            transcriptions.append(self._active_transcribe(recording))
+        if(len(transcriptions) == 1):
+            transcribed = transcriptions[0]
+        elif(len(transcriptions) > 1):
+            # Join the best guess for each part into one utterance
+            transcribed = [
+                " ".join([
+                    transcription[0]
+                    for transcription in transcriptions
+                    if transcription and transcription[0]
+                ])
+            ]
+        return transcribed
+
     def listen(self):
         if(self.passive_listen):
             self._logger.info("[passive_listen]")
@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
 import abc
 import collections
+import functools
+import gettext
+import io
+import itertools
 import logging
-import tempfile
+import math
+import queue
+import threading
 import wave
 import mad
 from . import paths
@@ -13,35 +19,64 @@ from . import commandline
 from . import profile
 
 
+_interface = None
+
+
+# All plugins share one commandline interface for asking about missing
+# settings. It is created, and the language checked, the first time a
+# plugin needs it.
+def _get_interface():
+    global _interface
+    if _interface is None:
+        _interface = commandline.commandline()
+        _interface.get_language(once=True)
+    return _interface
+
+
+# The core translations only depend on the locale directory, so parse
+# them once and share them between all plugin instances.
+@functools.lru_cache(maxsize=4)
+def _load_translations(locale_dir):
+    return i18n.parse_translations(locale_dir)
+
+
 class GenericPlugin(object):
     def __init__(self, info, *args):
         self._plugin_info = info
         if(not hasattr(self, '_logger')):
             self._logger = logging.getLogger(__name__)
-        interface = commandline.commandline()
-        interface.get_language(once=True)
-        translations = i18n.parse_translations(paths.data('locale'))
-        translator = i18n.GettextMixin(translations)
-        self.gettext = translator.gettext
         # Skip asking for missing settings if we are using a test profile
         if hasattr(self, 'settings') and not profile._test_profile:
+            interface = _get_interface()
+            translations = _load_translations(paths.data('locale'))
+            translator = i18n.GettextMixin(translations)
+            # Plugins that mix in GettextMixin keep their own gettext
+            if not hasattr(self, 'gettext'):
+                self.gettext = translator.gettext
             # set a variable here to tell us if all settings are
             # completed or not
             # If all settings do not currently exist, go ahead and
             # re-query all settings for this plugin
-            settings_complete = True
+            # If we are repopulating, there is no need to check.
+            settings_complete = not profile.get_arg("repopulate")
             # Step through the settings and check for
             # any missing settings
             settings = self.settings()
-            for setting in settings:
-                if not profile.check_profile_var_exists(setting):
-                    self._logger.info(
-                        "{} setting does not exist".format(setting)
-                    )
-                    # Go ahead and pull the setting
-                    settings_complete = False
-            if(profile.get_arg("repopulate") or not settings_complete):
-                print(interface.status_text(self.gettext(
+            if settings_complete:
+                existing = profile.existing_keys()
+                for setting in settings:
+                    if isinstance(setting, str):
+                        setting = (setting,)
+                    if setting not in existing:
+                        self._logger.info(
+                            "%s setting does not exist", setting
+                        )
+                        # One missing setting is enough to re-query
+                        # all of them, so stop looking
+                        settings_complete = False
+                        break
+            if not settings_complete:
+                print(interface.status_text(translator.gettext(
                     "Configuring {}"
                 ).format(
                     self._plugin_info.name
@@ -52,6 +87,11 @@ class GenericPlugin(object):
                     )
                 # Save the profile with the new settings
                 profile.save_profile()
+        elif not hasattr(self, 'gettext'):
+            # Nothing to configure, so don't bother loading the
+            # translations. Plugins that mix in GettextMixin keep
+            # their own gettext.
+            self.gettext = gettext.NullTranslations().gettext
 
     @property
     def info(self):
@@ -68,11 +108,13 @@ class SpeechHandlerPlugin(
     metaclass=abc.ABCMeta
 ):
     def __init__(self, *args, **kwargs):
-        GenericPlugin.__init__(self, *args, **kwargs)
+        # Set up the plugin's own translations first, since
+        # GenericPlugin.__init__ may call settings(), which uses them
         i18n.GettextMixin.__init__(
             self,
-            self.info.translations
+            args[0].translations
         )
+        GenericPlugin.__init__(self, *args, **kwargs)
 
     @abc.abstractmethod
     def intents(self):
@@ -104,10 +146,13 @@ class STTPlugin(GenericPlugin, metaclass=abc.ABCMeta):
             path=paths.sub('vocabularies', language)
         )
 
+        # matches_phrases compares the stored revision hash, so once it
+        # fails there is no need for compile() to check it again
         if not vocabulary.matches_phrases(self._vocabulary_phrases):
             vocabulary.compile(
                 compilation_func,
-                self._vocabulary_phrases
+                self._vocabulary_phrases,
+                force=True
             )
 
         self._vocabulary_path = vocabulary.path
@@ -132,28 +177,46 @@ class TTSPlugin(GenericPlugin, metaclass=abc.ABCMeta):
 
     def mp3_to_wave(self, filename):
         mf = mad.MadFile(filename)
-        with tempfile.SpooledTemporaryFile() as f:
+        with io.BytesIO() as f:
             wav = wave.open(f, mode='wb')
             wav.setframerate(mf.samplerate())
             wav.setnchannels(1 if mf.mode() == mad.MODE_SINGLE_CHANNEL else 2)
             # 4L is the sample width of 32 bit audio
             wav.setsampwidth(4)
-            frame = mf.read()
+            # Collect the decoded audio and hand it to the wave writer in
+            # one call rather than once per MAD frame
+            buf = bytearray()
+            read = mf.read
+            extend = buf.extend
+            frame = read()
             while frame is not None:
-                wav.writeframes(frame)
-                frame = mf.read()
+                extend(frame)
+                frame = read()
+            wav.writeframes(buf)
             wav.close()
-            f.seek(0)
-            data = f.read()
+            data = f.getvalue()
         return data
 
 
 class VADPlugin(GenericPlugin):
+    # Set this to True in a subclass to have get_audio pass each frame's
+    # samples to _voice_detected
+    _wants_samples = False
+
     # timeout is seconds of audio to capture before first
     # and after last voice detected
     # minimum capture is minimum audio to capture, minus the padding
     # at the front and end
-    def __init__(self, input_device, timeout=1, minimum_capture=0.5):
+    # maximum capture is the most audio in seconds to keep from a single
+    # utterance. If voice is detected for longer than this (continuous
+    # noise, for example), the oldest audio is dropped.
+    def __init__(
+        self,
+        input_device,
+        timeout=1,
+        minimum_capture=0.5,
+        maximum_capture=30
+    ):
         self._logger = logging.getLogger(__name__)
         # input device
         self._input_device = input_device
@@ -166,67 +229,266 @@ class VADPlugin(GenericPlugin):
         self._minimum_capture = round((timeout + minimum_capture) / chunklength)
         ct = input_device._input_chunksize / input_device._input_rate
         self._chunktime = ct
+        # memoryview format of a single sample, used by _as_samples.
+        # memoryview can't represent some widths (24 bit audio), so this
+        # is None for those.
+        self._sample_width = int(input_device._input_bits / 8)
+        self._sample_format = {1: 'b', 2: 'h', 4: 'i'}.get(
+            self._sample_width
+        )
+        # Audio captured before voice is detected. Only the last
+        # timeout frames (at most 30) are ever used, so don't keep more.
+        # Keep at least one so the frame voice is detected in is not lost
+        # when the timeout rounds down to 0 frames.
+        self._pre_roll = collections.deque(
+            [],
+            max(1, min(self._timeout, 30))
+        )
+        # Log messages used once per utterance
+        self._discard_msg = " ".join([
+            "Recorded %d frames, less than threshold",
+            "of %d frames (%.2f seconds). Discarding"
+        ])
+        self._recorded_msg = "Recorded %d frames"
+        # The longest utterance we will hold on to. Older frames fall
+        # off the front of the recording. It has to be long enough to
+        # pass the minimum capture check once the timeout has elapsed,
+        # otherwise every trimmed utterance would be discarded.
+        self._max_utterance_frames = max(
+            int(maximum_capture / self._chunktime),
+            self._minimum_capture + self._timeout
+        )
+        # Number of silent frames that make a gap worth sending to the
+        # partial callback
+        self._partial_gap = max(
+            self._timeout // 2,
+            math.ceil(0.2 / self._chunktime)
+        )
+        # The thread reading from the input device, see _record
+        self._capture_thread = None
+
+    # Return a zero-copy view of a frame as signed integer samples,
+    # so that subclasses can work on the samples themselves without
+    # slicing and decoding the raw bytes. Returns None if the sample
+    # width can't be represented or the frame holds a partial sample.
+    def _as_samples(self, frame):
+        if(
+            self._sample_format is None
+        )or(
+            len(frame) % self._sample_width
+        ):
+            return None
+        return memoryview(frame).cast(self._sample_format)
 
     # Override the _voice_detected method with your own method for
     # detecting whether a voice is detected or not. Return True if
     # you detect a voice, otherwise False.
+    # get_audio passes the raw frame as the first argument, plus the
+    # keyword argument recording (whether we are currently recording).
+    # If _wants_samples is True, it also passes samples (the frame as
+    # returned by _as_samples, which may be None).
     def _voice_detected(self, *args, **kwargs):
         pass
 
-    def get_audio(self):
-        frames = collections.deque([], 30)
-        last_voice_frame = 0
+    # Read frames from the input device until stop is set or the device
+    # stops yielding frames, then put None on the queue to mark the end.
+    # This runs on its own thread so that a slow _voice_detected call or
+    # a garbage collection pause does not delay reads from the device.
+    def _capture(self, frame_queue, stop):
+        input_device = self._input_device
+        recorder = None
+        try:
+            recorder = input_device.record(
+                input_device._input_chunksize,
+                input_device._input_bits,
+                input_device._input_channels,
+                input_device._input_rate
+            )
+            for frame in recorder:
+                if stop.is_set():
+                    break
+                frame_queue.put(frame)
+        except Exception as e:
+            # Hand the error to the consumer to be raised there
+            frame_queue.put(e)
+        finally:
+            if recorder is not None:
+                recorder.close()
+            frame_queue.put(None)
+
+    # Yield captured frames from the capture thread. Closing the
+    # generator stops the capture thread and closes the audio stream.
+    def _record(self):
+        if(
+            self._capture_thread is not None
+        )and(
+            self._capture_thread.is_alive()
+        ):
+            # The last capture thread stops after the next frame from the
+            # device. Wait for it to close its stream rather than open a
+            # second stream on the same device.
+            self._logger.debug(
+                "Waiting for input device '%s' to stop recording",
+                self._input_device.slug
+            )
+            self._capture_thread.join()
+        frame_queue = queue.Queue()
+        stop = threading.Event()
+        capture_thread = threading.Thread(
+            target=self._capture,
+            args=(frame_queue, stop),
+            daemon=True
+        )
+        self._capture_thread = capture_thread
+        capture_thread.start()
+        try:
+            while True:
+                frame = frame_queue.get()
+                if frame is None:
+                    # The input device has stopped recording
+                    return
+                if isinstance(frame, Exception):
+                    raise frame
+                yield frame
+        finally:
+            stop.set()
+            # The capture thread stops after its next frame. Don't wait
+            # forever for a device that has stopped delivering frames,
+            # the next call waits for it instead.
+            capture_thread.join(1)
+
+    # partial callback is an optional callable. When the speaker pauses
+    # for a short gap (at least 0.2 seconds and half the timeout) it is
+    # passed the frames up to the pause, which are then dropped from the
+    # recording. The first partial of an utterance is only sent if it
+    # would pass the minimum capture check. get_audio then only returns
+    # the audio after the last partial, or None if nothing was said
+    # after it.
+    def get_audio(self, partial_callback=None):
+        frames = self._pre_roll
+        frames.clear()
+        # Number of frames recorded since a voice was last detected
+        silent_frames = 0
+        trimming = False
+        # Whether part of this utterance was sent to the partial callback
+        partial_sent = False
         recording = False
-        recording_frames = []
+        recording_frames = collections.deque([], self._max_utterance_frames)
+        # Bind the per-frame lookups to locals once, outside the loop
+        input_device = self._input_device
+        voice_detector = self._voice_detected
+        as_samples = self._as_samples if self._wants_samples else None
+        partial_gap = self._partial_gap
+        timeout = self._timeout
+        max_frames = self._max_utterance_frames
         self._logger.info("Waiting for voice data")
-        for frame in self._input_device.record(
-            self._input_device._input_chunksize,
-            self._input_device._input_bits,
-            self._input_device._input_channels,
-            self._input_device._input_rate
-        ):
-            frames.append(frame)
-            voice_detected = self._voice_detected(frame, recording=recording)
-            if not recording:
-                if(voice_detected):
-                    # Voice activity detected, start recording and use
-                    # the last 10 frames to start
-                    self._logger.debug(
-                        "Started recording on device '{:s}'".format(
-                            self._input_device.slug
-                        )
+        frame_source = self._record()
+        try:
+            for frame in frame_source:
+                frames.append(frame)
+                if as_samples:
+                    voice_detected = voice_detector(
+                        frame,
+                        recording=recording,
+                        samples=as_samples(frame)
+                    )
+                else:
+                    voice_detected = voice_detector(
+                        frame,
+                        recording=recording
                     )
-                    recording = True
-                    # Include the previous 10 frames in the recording.
-                    recording_frames = list(frames)[-self._timeout:]
-                    last_voice_frame = len(recording_frames)
-            else:
-                # We're recording
-                recording_frames.append(frame)
-                if(voice_detected):
-                    last_voice_frame = len(recording_frames)
-                if(last_voice_frame < len(recording_frames) - self._timeout):
-                    # We have waited past the timeout number of frames
-                    # so we believe the speaker has finished speaking.
-                    recording = False
-                    if(len(recording_frames) < self._minimum_capture):
+                if not recording:
+                    if(voice_detected):
+                        # Voice activity detected, start recording and use
+                        # the last 10 frames to start
                         self._logger.debug(
+                            "Started recording on device '%s'",
+                            input_device.slug
+                        )
+                        recording = True
+                        # Include the previous 10 frames in the recording.
+                        recording_frames = collections.deque(
+                            frames,
+                            max_frames
+                        )
+                        silent_frames = 0
+                        trimming = False
+                        partial_sent = False
+                else:
+                    # We're recording
+                    if not trimming and len(recording_frames) == max_frames:
+                        # This append drops the oldest frame
+                        self._logger.warning(
                             " ".join([
-                                "Recorded {:d} frames, less than threshold",
-                                "of {:d} frames ({:.2f} seconds). Discarding"
-                            ]).format(
-                                len(recording_frames),
-                                self._minimum_capture,
-                                len(recording_frames) * self._chunktime
-                            )
+                                "Recording exceeded %d frames (%.2f seconds),",
+                                "discarding the oldest audio"
+                            ]),
+                            max_frames,
+                            max_frames * self._chunktime
                         )
+                        trimming = True
+                    recording_frames.append(frame)
+                    recorded = len(recording_frames)
+                    if(voice_detected):
+                        silent_frames = 0
                     else:
-                        self._logger.debug(
-                            "Recorded {:d} frames".format(
-                                len(recording_frames)
-                            )
+                        silent_frames += 1
+                    if(
+                        partial_callback
+                    )and(
+                        silent_frames == partial_gap
+                    )and(
+                        recorded > silent_frames
+                    )and(
+                        # Would this have been long enough to keep if the
+                        # speaker had stopped here?
+                        partial_sent or (
+                            recorded - silent_frames + timeout + 1
+                        ) >= self._minimum_capture
+                    ):
+                        # The speaker has paused. Send everything up to
+                        # the last voiced frame and keep only the gap.
+                        voice_end = recorded - silent_frames
+                        partial_callback(
+                            list(itertools.islice(recording_frames, voice_end))
+                        )
+                        recording_frames = collections.deque(
+                            itertools.islice(recording_frames, voice_end, None),
+                            max_frames
                         )
-                        return recording_frames
+                        recorded = silent_frames
+                        partial_sent = True
+                    if(silent_frames > timeout):
+                        # We have waited past the timeout number of frames
+                        # so we believe the speaker has finished speaking.
+                        recording = False
+                        if partial_sent:
+                            # Part of the utterance has already been sent,
+                            # so return the rest to tell the caller it is
+                            # over. If nothing was said since the last
+                            # partial, there is nothing left to transcribe.
+                            if recorded == silent_frames:
+                                return None
+                            self._logger.debug(
+                                self._recorded_msg,
+                                recorded
+                            )
+                            return list(recording_frames)
+                        if(recorded < self._minimum_capture):
+                            self._logger.debug(
+                                self._discard_msg,
+                                recorded,
+                                self._minimum_capture,
+                                recorded * self._chunktime
+                            )
+                        else:
+                            self._logger.debug(
+                                self._recorded_msg,
+                                recorded
+                            )
+                            return list(recording_frames)
+        finally:
+            frame_source.close()
 
 
 class STTTrainerPlugin(GenericPlugin):
@@ -234,13 +496,18 @@ class STTTrainerPlugin(GenericPlugin):
 
 
 class TTIPlugin(GenericPlugin, metaclass=abc.ABCMeta):
-    intent_map = {'intents': {}}
-    keywords = {}
     keyword_index = 0
-    regex = {}
-    words = {}
     trained = False
 
+    def __init__(self, *args, **kwargs):
+        GenericPlugin.__init__(self, *args, **kwargs)
+        # These are per instance, so intent parsers do not share (and
+        # have to search through) each other's intents
+        self.intent_map = {'intents': {}}
+        self.keywords = {}
+        self.regex = {}
+        self.words = {}
+
     def add_intent(self, intent):
         self.add_intents(intent)
 
@@ -23,6 +23,7 @@ from naomi import paths
 _profile = {}
 _profile_read = False
 _test_profile = False
+_existing_keys = None
 _args = {}
 profile_file = ""
 
@@ -47,14 +48,16 @@ def set_profile(custom_profile):
     """
     Set the profile to a custom value. This is especially helpful when testing
     """
-    global _profile, _profile_read, _test_profile
+    global _profile, _profile_read, _test_profile, _existing_keys
     _profile = custom_profile
+    _existing_keys = None
     _test_profile = True
     _profile_read = True
 
 
 def get_profile(command=""):
-    global _profile, _profile_read, _test_profile, profile_file
+    global _profile, _profile_read, _test_profile, _existing_keys
+    global profile_file
     _logger = logging.getLogger(__name__)
     command = command.strip().lower()
     if command == "reload":
@@ -62,6 +65,7 @@ def get_profile(command=""):
     elif command != "":
         raise ValueError("command '{}' not understood".format(command))
     if not _profile_read:
+        _existing_keys = None
         # Open and read the profile
         # Create .config/naomi dir if it does not exist yet
         if not os.path.exists(paths.SUB_PATH):
@@ -313,6 +317,27 @@ def check_profile_var_exists(path):
     return _walk_profile(path, False)
 
 
+def existing_keys():
+    """
+    Returns a frozenset with the path (as a tuple) of every option in the
+    profile, including options that contain suboptions. Checking a
+    number of paths against this set is cheaper than walking the profile
+    for each one. The set is rebuilt after the profile is changed.
+    """
+    global _existing_keys
+    if _existing_keys is None:
+        keys = set()
+        branches = [((), get_profile())]
+        while branches:
+            path, branch = branches.pop()
+            if isinstance(branch, dict):
+                for key, value in branch.items():
+                    keys.add(path + (key,))
+                    branches.append((path + (key,), value))
+        _existing_keys = frozenset(keys)
+    return _existing_keys
+
+
 def _walk_profile(path, returnValue):
     """
     Function to walk the profile
@@ -341,7 +366,8 @@ def _walk_profile(path, returnValue):
 
 
 def set_profile_var(path, value):
-    global _profile
+    global _profile, _existing_keys
+    _existing_keys = None
     temp = _profile
     if (isinstance(path, str)):
         path = [path]
@@ -362,7 +388,8 @@ def set_profile_var(path, value):
 
 
 def remove_profile_var(path):
-    global _profile
+    global _profile, _existing_keys
+    _existing_keys = None
     if (isinstance(path, str)):
         path = [path]
     temp = get_profile()
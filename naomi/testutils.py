@@ -62,11 +62,20 @@ class TestMic(object):
 
 # This class is required to create a fake input_device object
 # when performing tests on VAD plugins below.
+# If frames are passed in, record() yields them and then stops, as if
+# the device had been unplugged.
 class TestInput(object):
-    def __init__(self, input_rate, input_bits, input_chunksize):
+    def __init__(self, input_rate, input_bits, input_chunksize, frames=[]):
         self._input_rate = input_rate
         self._input_bits = input_bits
         self._input_chunksize = input_chunksize
+        self._input_channels = 1
+        self.slug = "testinput"
+        self.frames = frames
+
+    def record(self, *args):
+        for frame in self.frames:
+            yield frame
 
 
 class Test_VADPlugin(object):
@@ -125,6 +134,30 @@ class Test_VADPlugin(object):
             b'\x00' * self.clip_bytes
         ))
 
+    def test_get_audio_ends_with_input(self):
+        # The sample followed by two seconds of silence is recorded as
+        # one utterance, and get_audio returns None once the input
+        # device stops recording without a voice being detected.
+        with contextlib.closing(
+            wave.open(self.sample_file, "rb")
+        ) as wf:
+            audio = wf.readframes(wf.getnframes())
+        audio += b'\x00' * (self.sample_rate * 2 * 2)
+        frames = [
+            audio[offset:offset + self.clip_bytes]
+            for offset in range(
+                0,
+                len(audio) - self.clip_bytes,
+                self.clip_bytes
+            )
+        ]
+        self._test_input.frames = frames
+        recording = self.plugin.get_audio()
+        self.assertIsNotNone(recording)
+        self.assertIn(b''.join(recording), audio)
+        self._test_input.frames = []
+        self.assertIsNone(self.plugin.get_audio())
+
     def test_voice(self):
         # Get a sample of voice from a known sample
         # (naomi/data/audio/naomi.wav)
@@ -39,6 +39,7 @@ def is_keyword(word):
 class NaomiTTIPlugin(plugin.TTIPlugin):
     def __init__(self, *args, **kwargs):
         self._logger = logging.getLogger(__name__)
+        plugin.TTIPlugin.__init__(self, *args, **kwargs)
 
     def add_intents(self, intents):
         for intent in intents:
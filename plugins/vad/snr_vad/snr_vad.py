@@ -32,8 +32,17 @@ class SNRPlugin(plugin.VADPlugin, unittest.TestCase):
             ["snr_vad", "minimum_capture"],
             0.5
         )
+        maximum_capture = profile.get_profile_var(
+            ["snr_vad", "maximum_capture"],
+            30
+        )
         threshold = profile.get_profile_var(["snr_vad", "threshold"], 30)
-        super(SNRPlugin, self).__init__(input_device, timeout, minimum_capture)
+        super(SNRPlugin, self).__init__(
+            input_device,
+            timeout,
+            minimum_capture,
+            maximum_capture
+        )
         # if the audio decibel is greater than threshold, then consider this
         # having detected a voice.
         self._threshold = threshold
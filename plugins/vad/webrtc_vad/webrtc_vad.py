@@ -19,17 +19,23 @@ class WebRTCPlugin(plugin.VADPlugin, unittest.TestCase):
             ["webrtc_vad", "minimum_capture"],
             0.25
         )
+        maximum_capture = profile.get_profile_var(
+            ["webrtc_vad", "maximum_capture"],
+            30
+        )
         aggressiveness = profile.get_profile_var(
             ["webrtc_vad", "aggressiveness"],
             1
         )
         self._logger.info("timeout: {}".format(timeout))
         self._logger.info("minimum_capture: {}".format(minimum_capture))
+        self._logger.info("maximum_capture: {}".format(maximum_capture))
         self._logger.info("aggressiveness: {}".format(aggressiveness))
         super(WebRTCPlugin, self).__init__(
             input_device,
             timeout,
-            minimum_capture
+            minimum_capture,
+            maximum_capture
         )
         if aggressiveness not in [0, 2, 3]:
             aggressiveness = 1
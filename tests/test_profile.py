@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import unittest
+from naomi import profile
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        profile.set_profile({
+            'language': 'en-US',
+            'audio': {
+                'input_device': 'default',
+                'output': {'rate': 16000}
+            },
+            'keyword': 'Naomi',
+            'empty': None
+        })
+
+    def testExistingKeysMatchesCheckProfileVarExists(self):
+        existing = profile.existing_keys()
+        for path in [
+            ['language'],
+            ['audio'],
+            ['audio', 'input_device'],
+            ['audio', 'output', 'rate'],
+            ['empty'],
+            # non-dict intermediate
+            ['keyword', 'name'],
+            ['audio', 'input_device', 'name'],
+            # missing
+            ['missing'],
+            ['audio', 'missing'],
+            ['audio', 'output', 'missing']
+        ]:
+            self.assertEqual(
+                tuple(path) in existing,
+                profile.check_profile_var_exists(path),
+                path
+            )
+
+    def testExistingKeysSetProfileVar(self):
+        self.assertNotIn(('audio', 'output', 'bits'), profile.existing_keys())
+        profile.set_profile_var(['audio', 'output', 'bits'], 16)
+        self.assertIn(('audio', 'output', 'bits'), profile.existing_keys())
+        profile.set_profile_var(['new', 'branch'], True)
+        self.assertIn(('new',), profile.existing_keys())
+        self.assertIn(('new', 'branch'), profile.existing_keys())
+
+    def testExistingKeysRemoveProfileVar(self):
+        self.assertIn(('audio', 'output', 'rate'), profile.existing_keys())
+        profile.remove_profile_var(['audio', 'output'])
+        self.assertNotIn(('audio', 'output'), profile.existing_keys())
+        self.assertNotIn(('audio', 'output', 'rate'), profile.existing_keys())
+        self.assertIn(('audio', 'input_device'), profile.existing_keys())
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+from naomi import testutils
+from naomi import plugin
+
+# 30 ms of 16 bit audio at 16000 Hz
+CHUNKSIZE = 480
+VOICE = b'\x01' * (CHUNKSIZE * 2)
+SILENCE = b'\x00' * (CHUNKSIZE * 2)
+
+
+# A VAD plugin that detects a voice in any frame starting with \x01
+class ExampleVADPlugin(plugin.VADPlugin):
+    def _voice_detected(self, *args, **kwargs):
+        return args[0][:1] == b'\x01'
+
+
+# The same detector, working on the samples get_audio passes it
+class SamplesVADPlugin(plugin.VADPlugin):
+    _wants_samples = True
+
+    def _voice_detected(self, *args, **kwargs):
+        samples = kwargs["samples"]
+        if samples is None:
+            return args[0][:1] == b'\x01'
+        return samples[0] > 0
+
+
+# An input device that can't be opened
+class FailingInput(testutils.TestInput):
+    def record(self, *args):
+        raise IOError("Input device unavailable")
+
+
+# An input device that stalls after its frames until it is released,
+# and counts how many streams are open at once
+class StallingInput(testutils.TestInput):
+    def __init__(self, *args):
+        super(StallingInput, self).__init__(*args)
+        self.release = threading.Event()
+        self.open_streams = 0
+        self.max_open_streams = 0
+
+    def record(self, *args):
+        self.open_streams += 1
+        self.max_open_streams = max(self.max_open_streams, self.open_streams)
+        try:
+            for frame in self.frames:
+                yield frame
+            self.release.wait()
+            yield SILENCE
+        finally:
+            self.open_streams -= 1
+
+
+def get_vad_instance(frames, *args, **kwargs):
+    input_device = testutils.TestInput(16000, 16, CHUNKSIZE, frames)
+    return ExampleVADPlugin(input_device, *args, **kwargs)
+
+
+class TestVADPlugin(unittest.TestCase):
+    def testMaximumCaptureTrimsOldestAudio(self):
+        # timeout is 33 frames and minimum capture is 50 frames, so
+        # the longest recording we keep is the requested 100 frames.
+        frames = [SILENCE] * 5 + [VOICE] * 200 + [SILENCE] * 40
+        vad = get_vad_instance(frames, 1, 0.5, 3)
+        recording = vad.get_audio()
+        self.assertEqual(len(recording), 100)
+        self.assertEqual(recording[-1], SILENCE)
+
+    def testMaximumCaptureBelowMinimumCapture(self):
+        # A maximum capture shorter than the timeout plus the minimum
+        # capture is raised so utterances are not always discarded.
+        frames = [SILENCE] * 5 + [VOICE] * 60 + [SILENCE] * 40
+        vad = get_vad_instance(frames, 1, 0.5, 0.5)
+        recording = vad.get_audio()
+        self.assertIsNotNone(recording)
+        self.assertEqual(len(recording), 83)
+
+    def testInputEndsWhileRecording(self):
+        # If the input device stops before the speaker does, get_audio
+        # returns None instead of waiting for more audio.
+        frames = [SILENCE] * 5 + [VOICE] * 60
+        vad = get_vad_instance(frames)
+        self.assertIsNone(vad.get_audio())
+
+    def testInputDeviceFailsToOpen(self):
+        # An error opening the input device is raised from get_audio
+        # instead of leaving it waiting for frames
+        input_device = FailingInput(16000, 16, CHUNKSIZE)
+        vad = ExampleVADPlugin(input_device)
+        self.assertRaises(IOError, vad.get_audio)
+
+    def testOneStreamAtATime(self):
+        # The first capture thread is still waiting on the device when
+        # get_audio is called again, so that call waits for it to close
+        # its stream before opening another.
+        frames = [SILENCE] * 5 + [VOICE] * 60 + [SILENCE] * 40
+        input_device = StallingInput(16000, 16, CHUNKSIZE, frames)
+        vad = ExampleVADPlugin(input_device)
+        self.assertIsNotNone(vad.get_audio())
+        release = threading.Timer(0.5, input_device.release.set)
+        release.start()
+        input_device.frames = []
+        self.assertIsNone(vad.get_audio())
+        release.join()
+        self.assertEqual(input_device.max_open_streams, 1)
+
+    def testPartialCallback(self):
+        partials = []
+        frames = (
+            [SILENCE] * 5 + [VOICE] * 40 + [SILENCE] * 20
+            + [VOICE] * 10 + [SILENCE] * 40
+        )
+        vad = get_vad_instance(frames)
+        recording = vad.get_audio(partials.append)
+        # Each pause of 16 frames (half the timeout) sends everything
+        # up to the last voiced frame
+        self.assertEqual(
+            [len(partial) for partial in partials],
+            [45, 30]
+        )
+        self.assertEqual(partials[0][:5], [SILENCE] * 5)
+        self.assertEqual(partials[1][-1], VOICE)
+        # Nothing was said after the last partial
+        self.assertIsNone(recording)
+
+    def testPartialCallbackMinimumCapture(self):
+        # A short noise is not sent as a partial, and is discarded
+        # like it would be without a partial callback.
+        partials = []
+        frames = [SILENCE] * 5 + [VOICE] + [SILENCE] * 40
+        vad = get_vad_instance(frames)
+        self.assertIsNone(vad.get_audio(partials.append))
+        self.assertEqual(partials, [])
+
+    def testSamples(self):
+        vad = get_vad_instance([])
+        self.assertEqual(list(vad._as_samples(b'\x01\x00\xff\xff')), [1, -1])
+        # Partial samples can't be viewed
+        self.assertIsNone(vad._as_samples(b'\x01\x00\xff'))
+
+    def testSamplesPassedToVoiceDetected(self):
+        frames = [SILENCE] * 5 + [VOICE] * 60 + [SILENCE] * 40
+        input_device = testutils.TestInput(16000, 16, CHUNKSIZE, frames)
+        vad = SamplesVADPlugin(input_device)
+        self.assertEqual(len(vad.get_audio()), 99)
+
+    def testSamples24Bit(self):
+        # memoryview has no 24 bit format, so there are no samples, but
+        # recording still works
+        frames = [SILENCE] * 5 + [VOICE] * 60 + [SILENCE] * 40
+        input_device = testutils.TestInput(16000, 24, CHUNKSIZE, frames)
+        vad = SamplesVADPlugin(input_device)
+        self.assertIsNone(vad._as_samples(VOICE))
+        self.assertEqual(len(vad.get_audio()), 99)
+
+    def testZeroTimeoutKeepsOnsetFrame(self):
+        # A timeout shorter than one frame rounds to 0 frames, but the
+        # frame the voice starts in is still recorded
+        frames = [SILENCE] * 5 + [VOICE] * 60 + [SILENCE] * 5
+        vad = get_vad_instance(frames, 0.01, 0.5)
+        recording = vad.get_audio()
+        self.assertEqual(recording[0], VOICE)
+        self.assertEqual(len(recording), 61)